@@ -2,8 +2,10 @@ from __future__ import annotations
 
 from fastapi import FastAPI, HTTPException
 
-from serving.model_loader import load_model, prepare_features
+from serving.model_loader import load_model, load_thresholds, prepare_features
 from serving.schemas import PredictionRequest, PredictionResponse
+from src import config
+from src.models.evaluate import apply_thresholds
 
 app = FastAPI(title="Stockout Prediction API")
 
@@ -12,9 +14,11 @@ app = FastAPI(title="Stockout Prediction API")
 def predict(req: PredictionRequest):
     try:
         model, version = load_model()
-        features = prepare_features(req.dict())
+        payload = req.dict()
+        features = prepare_features(payload)
         prob = float(model.predict(features)[0])
-        prediction = int(prob >= 0.5)
+        thresholds = load_thresholds(str(version))
+        prediction = int(apply_thresholds([prob], thresholds, [payload[config.THRESHOLD_SEGMENT_COL]])[0])
         return PredictionResponse(prediction=prediction, probability=prob, model_version=str(version))
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=str(exc))
@@ -1,12 +1,15 @@
 """Utility to load production model and preprocess requests."""
 from __future__ import annotations
 
+from functools import lru_cache
+from pathlib import Path
+
 import pandas as pd
 import mlflow
 from scipy.sparse import csr_matrix, hstack
 
 from src.features.build_features import build_feature_matrix
-from src.utils import mlflow_utils
+from src.utils import mlflow_utils, model_cache
 from src import config
 
 
@@ -16,11 +19,22 @@ def load_model():
     versions = client.get_latest_versions(config.MLFLOW_MODEL_NAME, stages=["Production"])
     if not versions:
         raise RuntimeError("No Production model available")
-    model_uri = versions[0].source
-    model = mlflow.lightgbm.load_model(model_uri)
+    model = model_cache.load_registered_model(versions[0].version, versions[0].run_id, versions[0].source)
     return model, versions[0].version
 
 
+@lru_cache(maxsize=8)
+def load_thresholds(version: str) -> dict:
+    """Decision thresholds logged with a model version, fetched once per process."""
+    client = mlflow.MlflowClient()
+    source = client.get_model_version(config.MLFLOW_MODEL_NAME, str(version)).source
+    # errors listing or loading propagate, so lru_cache never pins a fallback after a transient failure
+    names = {Path(a.path).name for a in mlflow.artifacts.list_artifacts(artifact_uri=source)}
+    if "thresholds.json" not in names:  # models logged before thresholds were tracked
+        return {"default": config.DEFAULT_THRESHOLD, "segments": {}}
+    return mlflow.artifacts.load_dict(f"{source}/thresholds.json")
+
+
 def prepare_features(payload: dict):
     df = pd.DataFrame([payload])
     df["LastUpdatedAt"] = pd.to_datetime(df["Date"], errors="coerce", utc=True)
@@ -9,10 +9,14 @@ SAMPLE_DATA_DIR = DATA_DIR / "sample"
 ARTIFACTS_DIR = PROJECT_ROOT / "artifacts"
 CHECKPOINT_DIR = ARTIFACTS_DIR / "checkpoints"
 MODEL_DIR = ARTIFACTS_DIR / "models"
+MODEL_CACHE_DIR = ARTIFACTS_DIR / "model_cache"
+MODEL_CACHE_MAX_BYTES = 512 * 1024 ** 2
+MODEL_CACHE_MEMORY_ENTRIES = 4
 SEED = 42
 DEFAULT_HORIZON_DAYS = 7
 HASH_SPACE = 2 ** 12
 CROSS_HASH_SPACE = 2 ** 10
+MOVEMENT_WINDOWS_DAYS = (7, 30, 90)  # trailing windows for movement features
 
 MLFLOW_TRACKING_URI = f"file:{PROJECT_ROOT / 'mlruns'}"
 MLFLOW_EXPERIMENT = "stockout_prediction"
@@ -20,6 +24,13 @@ MLFLOW_MODEL_NAME = "stockout_classifier"
 
 ACCEPTANCE_THRESHOLD = 0.7  # minimum F1 for promotion
 IMBALANCE_THRESHOLD = 0.2  # minority proportion threshold
+TRAIN_NUM_WORKERS = 1  # >1 trains data-parallel across local worker processes
+TRAIN_TREE_LEARNER = "data"  # LightGBM network learner: "data" or "voting"
+TRAIN_PARTITION_COL = "BranchID"  # rows sharing a value stay on one distributed training worker
+TRAIN_NETWORK_TIMEOUT_MINUTES = 5  # LightGBM socket time_out, so a rank whose peer died does not wait forever
+DEFAULT_THRESHOLD = 0.5  # decision threshold when no tuned threshold is available
+THRESHOLD_SEGMENT_COL = "BranchID"  # column used for per-segment thresholds
+THRESHOLD_MIN_SUPPORT = 20  # minimum validation rows before a segment gets its own threshold
 
 SCHEMA: Dict[str, Dict[str, str]] = {
     "stock_current": {
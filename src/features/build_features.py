@@ -3,32 +3,95 @@ from __future__ import annotations
 
 import pandas as pd
 import numpy as np
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 
 from src import config
-from src.utils.hashing import hash_categorical, hash_feature_cross, stack_sparse
+from src.utils.encoding import code_hashes
+from src.utils.hashing import factorize_ids, hash_code_cross, hash_codes, stack_sparse, value_hashes
 
 
-def _aggregate_movement(df_movement: pd.DataFrame) -> pd.DataFrame:
-    if df_movement.empty:
-        return pd.DataFrame(columns=["BranchID", "ItemCode", "net_movement"])
-    df_movement["Date"] = pd.to_datetime(df_movement["Date"], errors="coerce", utc=True)
-    outflow = (
-        df_movement.groupby(["FromBranchID", "ItemCode"]).QuantityMoved.sum().reset_index().rename(
-            columns={"FromBranchID": "BranchID", "QuantityMoved": "outflow"}
-        )
-    )
-    inflow = (
-        df_movement.groupby(["ToBranchID", "ItemCode"]).QuantityMoved.sum().reset_index().rename(
-            columns={"ToBranchID": "BranchID", "QuantityMoved": "inflow"}
-        )
-    )
-    movement = outflow.merge(inflow, on=["BranchID", "ItemCode"], how="outer").fillna(0)
-    movement["net_movement"] = movement["inflow"] - movement["outflow"]
-    return movement[["BranchID", "ItemCode", "net_movement"]]
+def _movement_columns(windows=config.MOVEMENT_WINDOWS_DAYS) -> list:
+    columns = ["net_movement"]
+    for w in windows:
+        columns += [f"inflow_{w}d", f"outflow_{w}d", f"net_movement_{w}d"]
+    return columns
+
+
+def _to_days(values: pd.Series) -> np.ndarray:
+    dates = pd.to_datetime(values, errors="coerce", utc=True)
+    return ((dates - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(days=1)).to_numpy(dtype=float)
+
+
+def _pair_keys(branch: np.ndarray, item: np.ndarray, snap_branch: np.ndarray, snap_item: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Dense (BranchID, ItemCode) keys for movement and snapshot rows; -1 where the pair is unknown."""
+    if all(np.issubdtype(a.dtype, np.integer) for a in (branch, item, snap_branch, snap_item)):
+        width = int(max(item.max(initial=0), snap_item.max(initial=0))) + 1
+        keys = branch.astype(np.int64) * width + item
+        snap_keys = snap_branch.astype(np.int64) * width + snap_item
+        return np.where((branch < 0) | (item < 0), -1, keys), np.where((snap_branch < 0) | (snap_item < 0), -1, snap_keys)
+    codes, pairs = pd.factorize(pd.MultiIndex.from_arrays([branch, item]))
+    return codes, pairs.get_indexer(pd.MultiIndex.from_arrays([snap_branch, snap_item]))
+
+
+def aggregate_movement(df_movement: pd.DataFrame, df_stock: pd.DataFrame, windows=config.MOVEMENT_WINDOWS_DAYS) -> pd.DataFrame:
+    """Movement features aligned to ``df_stock`` rows.
+
+    ``net_movement`` covers all history; the windowed columns cover the trailing
+    ``w`` days up to and including each row's ``LastUpdatedAt``. From/To flows are
+    stacked into one array keyed by (BranchID, ItemCode, day) and sorted once, so
+    every window is a difference of prefix sums found with ``searchsorted``.
+    Nothing here depends on the label horizon, so compute it once and pass it to
+    ``create_label`` for every horizon.
+    """
+    out = pd.DataFrame(0.0, index=df_stock.index, columns=_movement_columns(windows))
+    if df_movement.empty or df_stock.empty:
+        return out
+
+    n = len(df_movement)
+    qty = df_movement["QuantityMoved"].fillna(0).to_numpy(dtype=float)
+    branch = np.concatenate([df_movement["FromBranchID"].to_numpy(), df_movement["ToBranchID"].to_numpy()])
+    item = np.tile(df_movement["ItemCode"].to_numpy(), 2)
+    inflow = np.concatenate([np.zeros(n), qty])
+    outflow = np.concatenate([qty, np.zeros(n)])
+    move_day = np.tile(_to_days(df_movement["Date"]), 2)
+    snap_day = _to_days(df_stock["LastUpdatedAt"])
 
+    codes, snap_codes = _pair_keys(branch, item, df_stock["BranchID"].to_numpy(), df_stock["ItemCode"].to_numpy())
 
-def create_label(df_sales: pd.DataFrame, df_stock: pd.DataFrame, horizon_days: int, df_movement: pd.DataFrame | None = None) -> pd.DataFrame:
+    # day offsets >= 1 within each key; undated movements sit at offset 0 and cancel out of every window
+    known_days = np.concatenate([move_day[~np.isnan(move_day)], snap_day[~np.isnan(snap_day)]])
+    base = (known_days.min() if len(known_days) else 0) - max(windows, default=0) - 1
+    move_offset = np.nan_to_num(move_day - base, nan=0).astype(np.int64)
+    snap_offset = np.nan_to_num(snap_day - base, nan=0).astype(np.int64)
+    span = int(max(move_offset.max(), snap_offset.max())) + 1
+
+    composite = codes.astype(np.int64) * span + move_offset
+    order = np.argsort(composite, kind="stable")
+    composite = composite[order]
+    cum_in = np.concatenate([[0.0], np.cumsum(inflow[order])])
+    cum_out = np.concatenate([[0.0], np.cumsum(outflow[order])])
+
+    has_key = snap_codes >= 0
+    key_base = np.where(has_key, snap_codes, 0).astype(np.int64) * span
+    start = np.searchsorted(composite, key_base, side="left")
+    end = np.searchsorted(composite, key_base + span - 1, side="right")
+    net_total = (cum_in[end] - cum_in[start]) - (cum_out[end] - cum_out[start])
+    out["net_movement"] = np.where(has_key, net_total, 0.0)
+
+    in_window = has_key & ~np.isnan(snap_day)
+    hi = np.searchsorted(composite, key_base + snap_offset, side="right")
+    for w in windows:
+        lo = np.searchsorted(composite, key_base + np.maximum(snap_offset - w, 0), side="right")
+        window_in = np.where(in_window, cum_in[hi] - cum_in[lo], 0.0)
+        window_out = np.where(in_window, cum_out[hi] - cum_out[lo], 0.0)
+        out[f"inflow_{w}d"] = window_in
+        out[f"outflow_{w}d"] = window_out
+        out[f"net_movement_{w}d"] = window_in - window_out
+    return out
+
+
+def create_label(df_sales: pd.DataFrame, df_stock: pd.DataFrame, horizon_days: int, movement: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Label stock rows; ``movement`` is ``aggregate_movement`` output aligned to ``df_stock``."""
     future_sales = (
         df_sales.groupby(["BranchID", "ItemCode"])
         .rolling(f"{horizon_days}D", on="Date")
@@ -36,13 +99,12 @@ def create_label(df_sales: pd.DataFrame, df_stock: pd.DataFrame, horizon_days: i
         .reset_index()
         .rename(columns={"QuantitySold": "future_sales"})
     )
-    merged = df_stock.merge(future_sales, on=["BranchID", "ItemCode"], how="left")
+    stock = df_stock.copy()
+    if movement is None:
+        movement = pd.DataFrame(0.0, index=stock.index, columns=_movement_columns())
+    stock[movement.columns] = movement
+    merged = stock.merge(future_sales, on=["BranchID", "ItemCode"], how="left")
     merged["future_sales"].fillna(0, inplace=True)
-    merged["net_movement"] = 0
-    if df_movement is not None:
-        movement = _aggregate_movement(df_movement)
-        merged = merged.merge(movement, on=["BranchID", "ItemCode"], how="left")
-        merged["net_movement"].fillna(0, inplace=True)
     merged["projected_stock"] = merged["CurrentQuantity"] - merged["ReservedQuantity"] - merged["future_sales"] + merged["net_movement"]
     merged["label_stockout"] = (merged["projected_stock"] < merged["SafetyStockLevel"]).astype(int)
     # placeholders to satisfy hashing requirements
@@ -51,17 +113,38 @@ def create_label(df_sales: pd.DataFrame, df_stock: pd.DataFrame, horizon_days: i
     return merged
 
 
-def build_feature_matrix(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, list]:
-    numeric_cols = ["CurrentQuantity", "ReservedQuantity", "SafetyStockLevel", "future_sales", "projected_stock", "net_movement"]
-    X_numeric = df[numeric_cols].fillna(0).to_numpy()
+def _key_codes(series: pd.Series, vocab: Optional[Dict[str, pd.Index]], kind: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer codes plus per-code hashes for an ID column, encoded or raw."""
+    if vocab is not None:
+        return series.to_numpy(dtype=np.int32), code_hashes(vocab, kind)
+    return factorize_ids(series)
+
+
+def build_feature_matrix(df: pd.DataFrame, vocab: Optional[Dict[str, pd.Index]] = None) -> Tuple[np.ndarray, np.ndarray, list]:
+    """Build numeric and hashed sparse features.
+
+    With ``vocab`` the ID columns hold int32 codes from ``src.utils.encoding``;
+    without it they hold raw IDs (e.g. serving payloads). Both hash identically.
+    """
+    base_cols = ["CurrentQuantity", "ReservedQuantity", "SafetyStockLevel", "future_sales", "projected_stock"]
+    movement_cols = _movement_columns()
+    numeric_cols = base_cols + movement_cols
+    # only movement features may be absent (e.g. serving payloads); the core columns stay required
+    X_numeric = df[base_cols].join(df.reindex(columns=movement_cols)).fillna(0).to_numpy()
+
+    item, item_hashes = _key_codes(df["ItemCode"], vocab, "item")
+    branch, branch_hashes = _key_codes(df["BranchID"], vocab, "branch")
+    from_branch, from_hashes = _key_codes(df.get("FromBranchID", df["BranchID"]), vocab, "branch")
+    to_branch, to_hashes = _key_codes(df.get("ToBranchID", df["BranchID"]), vocab, "branch")
+    month = df["LastUpdatedAt"].dt.month.fillna(0).astype(int).to_numpy()
+    month_hashes = value_hashes([str(m) for m in range(13)])
 
-    hashed_item = hash_categorical(df["ItemCode"], config.HASH_SPACE)
-    hashed_branch = hash_categorical(df["BranchID"], config.HASH_SPACE)
-    hashed_from_branch = hash_categorical(df.get("FromBranchID", df["BranchID"]), config.HASH_SPACE)
-    hashed_to_branch = hash_categorical(df.get("ToBranchID", df["BranchID"]), config.HASH_SPACE)
-    hashed_cross = hash_feature_cross(df["ItemCode"], df["BranchID"], config.CROSS_HASH_SPACE)
-    month = df["LastUpdatedAt"].dt.month.fillna(0).astype(int)
-    hashed_item_month = hash_feature_cross(df["ItemCode"], month.astype(str), config.CROSS_HASH_SPACE)
+    hashed_item = hash_codes(item, item_hashes, config.HASH_SPACE)
+    hashed_branch = hash_codes(branch, branch_hashes, config.HASH_SPACE)
+    hashed_from_branch = hash_codes(from_branch, from_hashes, config.HASH_SPACE)
+    hashed_to_branch = hash_codes(to_branch, to_hashes, config.HASH_SPACE)
+    hashed_cross = hash_code_cross(item, item_hashes, branch, branch_hashes, config.CROSS_HASH_SPACE)
+    hashed_item_month = hash_code_cross(item, item_hashes, month, month_hashes, config.CROSS_HASH_SPACE)
 
     X_sparse = stack_sparse([hashed_item, hashed_branch, hashed_from_branch, hashed_to_branch, hashed_cross, hashed_item_month])
     y = df["label_stockout"].to_numpy()
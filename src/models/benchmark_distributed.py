@@ -0,0 +1,90 @@
+"""Scaling benchmark for distributed LightGBM training on a synthetic design matrix.
+
+Usage: python -m src.models.benchmark_distributed --rows 200000 --workers 1 2 4 8 --rounds 200
+
+Workers run on one host, so speedup is bounded by its cores; 1 worker is the in-process baseline.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+import lightgbm as lgb
+import numpy as np
+from scipy.sparse import csr_matrix, hstack, random as sparse_random
+from sklearn.model_selection import train_test_split
+
+from src import config
+from src.models.distributed import train_distributed
+from src.models.evaluate import evaluate_predictions
+from src.models.train import LGB_PARAMS, handle_imbalance, training_callbacks
+
+
+def synthetic_design(rows: int, n_branches: int = 64, sparse_cols: int = 2048) -> Tuple[csr_matrix, np.ndarray, np.ndarray]:
+    """Numeric + sparse hashed-like features with a learnable stockout signal and BranchID keys."""
+    rng = np.random.default_rng(config.SEED)
+    numeric = rng.normal(size=(rows, 16))
+    hashed = sparse_random(rows, sparse_cols, density=6 / sparse_cols, format="csr", random_state=config.SEED)
+    hashed.data[:] = 1.0
+    logit = 1.5 * numeric[:, 0] - numeric[:, 1] + 0.5 * numeric[:, 2] * numeric[:, 3]
+    y = (rng.random(rows) < 1 / (1 + np.exp(-logit))).astype(int)
+    branches = np.array([f"B{i}" for i in rng.integers(0, n_branches, rows)])
+    return hstack([csr_matrix(numeric), hashed]).tocsr(), y, branches
+
+
+def run_benchmark(rows: int, workers: List[int], rounds: int = 200, tree_learner: str = config.TRAIN_TREE_LEARNER) -> List[Dict]:
+    """Train a fixed number of rounds (no early stopping) per worker count so timings are comparable."""
+    X, y, branches = synthetic_design(rows)
+    X_train, X_val, y_train, y_val, b_train, _ = train_test_split(X, y, branches, test_size=0.2, random_state=config.SEED)
+    results = []
+    for n in workers:
+        start = time.perf_counter()
+        if n == 1:
+            X_bal, y_bal = handle_imbalance(X_train, y_train)
+            lgb_train = lgb.Dataset(X_bal, label=y_bal)
+            lgb_val = lgb.Dataset(X_val, label=y_val, reference=lgb_train)
+            model = lgb.train(
+                LGB_PARAMS,
+                lgb_train,
+                valid_sets=[lgb_train, lgb_val],
+                num_boost_round=rounds,
+                callbacks=training_callbacks(LGB_PARAMS["learning_rate"], verbose=False, early_stopping_rounds=None),
+            )
+        else:
+            model, _ = train_distributed(
+                X_train,
+                y_train,
+                X_val,
+                y_val,
+                LGB_PARAMS,
+                n,
+                partition_keys=b_train,
+                tree_learner=tree_learner,
+                num_boost_round=rounds,
+                verbose=False,
+                early_stopping_rounds=None,
+            )
+        elapsed = time.perf_counter() - start
+        auc = evaluate_predictions(y_val, model.predict(X_val))["auc"]
+        results.append({"workers": n, "seconds": elapsed, "val_auc": auc})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--tree-learner", default=config.TRAIN_TREE_LEARNER, choices=["data", "voting"])
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.workers, args.rounds, args.tree_learner)
+    baseline = results[0]["seconds"]
+    print(f"{'workers':>7} {'seconds':>9} {'speedup':>8} {'val_auc':>8}")
+    for r in results:
+        print(f"{r['workers']:>7} {r['seconds']:>9.2f} {baseline / r['seconds']:>8.2f} {r['val_auc']:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
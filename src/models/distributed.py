@@ -0,0 +1,163 @@
+"""Data-parallel LightGBM training across local worker processes."""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import queue
+import socket
+from typing import Dict, List, Optional, Tuple
+
+import lightgbm as lgb
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from src import config
+from src.utils.hashing import value_hashes
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def partition_rows(keys: Optional[np.ndarray], n_rows: int, num_workers: int) -> List[np.ndarray]:
+    """Row indices per worker, grouped by hash of ``keys`` (e.g. BranchID).
+
+    Falls back to round-robin when there are no keys or a hash partition would leave a worker empty.
+    """
+    if keys is not None:
+        values, inverse = np.unique(np.asarray(keys).astype(str), return_inverse=True)
+        shard = (value_hashes(values) % np.uint64(num_workers)).astype(np.int64)[inverse]
+        parts = [np.flatnonzero(shard == rank) for rank in range(num_workers)]
+        if all(len(p) for p in parts):
+            return parts
+    return [np.arange(rank, n_rows, num_workers) for rank in range(num_workers)]
+
+
+def _train_worker(
+    rank: int,
+    ports: List[int],
+    params: Dict,
+    X: csr_matrix,
+    y: np.ndarray,
+    X_val: csr_matrix,
+    y_val: np.ndarray,
+    num_boost_round: int,
+    verbose: bool,
+    early_stopping_rounds: Optional[int],
+) -> Tuple[str, Dict]:
+    # deferred: src.models.train imports this module
+    from src.models.train import training_callbacks
+
+    worker_params = {
+        **params,
+        "num_machines": len(ports),
+        "machines": ",".join(f"127.0.0.1:{port}" for port in ports),
+        "local_listen_port": ports[rank],
+        "time_out": config.TRAIN_NETWORK_TIMEOUT_MINUTES,
+        "pre_partition": True,
+        "num_threads": max(1, (os.cpu_count() or 1) // len(ports)),
+    }
+    lgb_train = lgb.Dataset(X, label=y)
+    # every worker scores the full validation set, so early stopping stops all ranks on the same round
+    lgb_val = lgb.Dataset(X_val, label=y_val, reference=lgb_train)
+    eval_result: Dict = {}
+    model = lgb.train(
+        worker_params,
+        lgb_train,
+        valid_sets=[lgb_train, lgb_val],
+        num_boost_round=num_boost_round,
+        callbacks=training_callbacks(
+            params["learning_rate"],
+            verbose=verbose and rank == 0,
+            early_stopping_rounds=early_stopping_rounds,
+            eval_result=eval_result,
+        ),
+    )
+    return model.model_to_string(), eval_result
+
+
+def _run_rank(results: multiprocessing.Queue, rank: int, *args) -> None:
+    """Process target: report ``(rank, result, error)`` so the parent can stop the others on the first error."""
+    try:
+        results.put((rank, _train_worker(rank, *args), None))
+    except BaseException as exc:
+        results.put((rank, None, exc))
+        raise
+
+
+def _collect(procs: List[multiprocessing.Process], results: multiprocessing.Queue) -> Dict[int, Tuple[str, Dict]]:
+    collected: Dict[int, Tuple[str, Dict]] = {}
+    while len(collected) < len(procs):
+        try:
+            rank, result, error = results.get(timeout=1)
+        except queue.Empty:
+            # a rank that died without reporting (killed, unpicklable error) must not leave us waiting
+            for rank, proc in enumerate(procs):
+                if rank not in collected and proc.exitcode is not None:
+                    raise RuntimeError(f"training rank {rank} exited with code {proc.exitcode} without a result")
+            continue
+        if error is not None:
+            raise error
+        collected[rank] = result
+    return collected
+
+
+def _balanced_rows(y: np.ndarray) -> np.ndarray:
+    """Row indices after ``handle_imbalance`` on the whole training set.
+
+    Resampling happens before partitioning so a shard holding one class cannot make the sampler fail on one rank.
+    """
+    from src.models.train import handle_imbalance
+
+    rows, _ = handle_imbalance(np.arange(len(y)).reshape(-1, 1), y)
+    return np.asarray(rows).ravel()
+
+
+def train_distributed(
+    X_train: csr_matrix,
+    y_train: np.ndarray,
+    X_val: csr_matrix,
+    y_val: np.ndarray,
+    params: Dict,
+    num_workers: int,
+    partition_keys: Optional[np.ndarray] = None,
+    tree_learner: str = config.TRAIN_TREE_LEARNER,
+    num_boost_round: int = 500,
+    verbose: bool = True,
+    early_stopping_rounds: Optional[int] = 30,
+) -> Tuple[lgb.Booster, Dict]:
+    """Train one Booster with LightGBM network learning over ``num_workers`` localhost processes.
+
+    Rank 0 logs and checkpoints when ``verbose``; its model (all ranks hold the same trees) and
+    per-iteration evaluation history are returned. The first failing rank aborts the others.
+    """
+    params = {**params, "tree_learner": tree_learner}
+    rows = _balanced_rows(y_train)
+    keys = np.asarray(partition_keys)[rows] if partition_keys is not None else None
+    parts = [rows[idx] for idx in partition_rows(keys, len(rows), num_workers)]
+    ports = [_free_port() for _ in range(num_workers)]
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(
+            target=_run_rank,
+            args=(results, rank, ports, params, X_train[idx], y_train[idx], X_val, y_val, num_boost_round, verbose, early_stopping_rounds),
+            daemon=True,
+        )
+        for rank, idx in enumerate(parts)
+    ]
+    for proc in procs:
+        proc.start()
+    try:
+        collected = _collect(procs, results)
+    finally:
+        # after a failure the surviving ranks block on the network until time_out; stop them instead
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+        for proc in procs:
+            proc.join()
+    model_string, eval_result = collected[0]
+    return lgb.Booster(model_str=model_string), eval_result
@@ -2,12 +2,164 @@
 from __future__ import annotations
 
 import numpy as np
-from sklearn.metrics import precision_recall_fscore_support, roc_auc_score
-from typing import Dict
+import pandas as pd
+from typing import Dict, Optional
 
+from src import config
+from src.utils.encoding import canonical_ids
 
-def evaluate_predictions(y_true: np.ndarray, y_prob: np.ndarray, threshold: float = 0.5) -> Dict[str, float]:
-    y_pred = (y_prob >= threshold).astype(int)
-    precision, recall, f1, _ = precision_recall_fscore_support(y_true, y_pred, average="binary")
-    auc = roc_auc_score(y_true, y_prob)
-    return {"precision": float(precision), "recall": float(recall), "f1": float(f1), "auc": float(auc)}
+
+ALL_SEGMENTS = "__all__"  # segment label of the overall (unsegmented) sweep rows
+MISSING_SEGMENT = "__missing__"  # segment label for rows without a segment value
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    num = np.asarray(num, dtype=float)
+    den = np.asarray(den, dtype=float)
+    return np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+
+
+def threshold_sweep(y_true: np.ndarray, y_prob: np.ndarray, segments: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """Precision/recall/F1 at every distinct score, overall and per segment, from cumulative counts.
+
+    Scores are sorted once; the per-segment order is a stable integer sort of the segment codes
+    over that order. Rows with segment ``ALL_SEGMENTS`` cover every row, and each row describes
+    predicting positive for ``y_prob >= threshold`` within its segment.
+    """
+    y_true = np.asarray(y_true).astype(int)
+    y_prob = np.asarray(y_prob, dtype=float)
+    order = np.argsort(-y_prob, kind="stable")
+    labels = [ALL_SEGMENTS]
+    group = np.zeros(len(order), dtype=np.int64)
+    if segments is not None:
+        segments = pd.Series(np.asarray(segments, dtype=object)).fillna(MISSING_SEGMENT).to_numpy()
+        codes, uniques = pd.factorize(segments)
+        by_segment = order[np.argsort(codes[order], kind="stable")]
+        order = np.concatenate([order, by_segment])
+        group = np.concatenate([group, codes[by_segment] + 1])
+        labels += list(uniques)
+
+    y_s, p_s, g_s = y_true[order], y_prob[order], group
+    tp = np.cumsum(y_s)
+    fp = np.cumsum(1 - y_s)
+
+    starts = np.r_[0, np.flatnonzero(np.diff(g_s)) + 1]
+    sizes = np.diff(np.r_[starts, len(g_s)])
+    tp = tp - np.repeat(np.r_[0, tp][starts], sizes)
+    fp = fp - np.repeat(np.r_[0, fp][starts], sizes)
+    pos = np.repeat(tp[starts + sizes - 1], sizes)
+    neg = np.repeat(fp[starts + sizes - 1], sizes)
+
+    # keep the last row of every run of tied scores so ties are cut together
+    last = np.r_[(g_s[1:] != g_s[:-1]) | (p_s[1:] != p_s[:-1]), True]
+    tp, fp, pos, neg, p_s, g_s = tp[last], fp[last], pos[last], neg[last], p_s[last], g_s[last]
+    fn = pos - tp
+
+    return pd.DataFrame(
+        {
+            "segment": np.array(labels, dtype=object)[g_s],
+            "threshold": p_s,
+            "tp": tp,
+            "fp": fp,
+            "fn": fn,
+            "tn": neg - fp,
+            "precision": _safe_div(tp, tp + fp),
+            "recall": _safe_div(tp, pos),
+            "f1": _safe_div(2 * tp, 2 * tp + fp + fn),
+            "tpr": _safe_div(tp, pos),
+            "fpr": _safe_div(fp, neg),
+        }
+    )
+
+
+def _auc_from_sweep(sweep: pd.DataFrame) -> pd.Series:
+    codes, uniques = pd.factorize(sweep["segment"])
+    first = np.r_[True, codes[1:] != codes[:-1]]
+    tpr = sweep["tpr"].to_numpy()
+    fpr = sweep["fpr"].to_numpy()
+    prev_tpr = np.where(first, 0.0, np.r_[0.0, tpr[:-1]])
+    prev_fpr = np.where(first, 0.0, np.r_[0.0, fpr[:-1]])
+    area = np.bincount(codes, weights=(fpr - prev_fpr) * (tpr + prev_tpr) / 2, minlength=len(uniques))
+    # AUC is undefined for segments holding a single class
+    has_pos = (sweep["tp"] + sweep["fn"]).to_numpy()[first] > 0
+    has_neg = (sweep["fp"] + sweep["tn"]).to_numpy()[first] > 0
+    area[~(has_pos & has_neg)] = np.nan
+    return pd.Series(area, index=uniques)
+
+
+def sweep_metrics(sweep: pd.DataFrame, threshold: float = config.DEFAULT_THRESHOLD, segment=ALL_SEGMENTS) -> Dict[str, float]:
+    """Precision/recall/F1 at ``threshold`` plus AUC for one segment of a sweep."""
+    rows = sweep[sweep["segment"] == segment]
+    cut = rows[rows["threshold"] >= threshold]
+    tp = int(cut["tp"].iloc[-1]) if len(cut) else 0
+    fp = int(cut["fp"].iloc[-1]) if len(cut) else 0
+    pos = int(rows["tp"].iloc[0] + rows["fn"].iloc[0])
+    return {
+        "precision": float(_safe_div(tp, tp + fp)),
+        "recall": float(_safe_div(tp, pos)),
+        "f1": float(_safe_div(2 * tp, tp + fp + pos)),
+        "auc": float(_auc_from_sweep(rows).iloc[0]),
+    }
+
+
+def best_operating_points(sweep: pd.DataFrame) -> pd.DataFrame:
+    """Best-F1 operating point and AUC for every segment of a sweep.
+
+    A sweep threshold is an observed score, so the returned cutoff sits midway between the chosen
+    score and the segment's next lower score instead of on the lowest-scoring positive kept.
+    """
+    lower = sweep.groupby("segment", sort=False)["threshold"].shift(-1).fillna(sweep["threshold"])
+    sweep = sweep.assign(threshold=(sweep["threshold"] + lower) / 2)
+    best = sweep.loc[sweep.groupby("segment", sort=False)["f1"].idxmax()].set_index("segment")
+    best["auc"] = _auc_from_sweep(sweep)
+    best["support"] = best[["tp", "fp", "fn", "tn"]].sum(axis=1)
+    return best[["threshold", "precision", "recall", "f1", "auc", "support"]]
+
+
+def segment_metrics(y_true: np.ndarray, y_prob: np.ndarray, segments: Optional[np.ndarray] = None) -> pd.DataFrame:
+    return best_operating_points(threshold_sweep(y_true, y_prob, segments))
+
+
+def select_thresholds(sweep: pd.DataFrame, min_support: int = config.THRESHOLD_MIN_SUPPORT) -> Dict:
+    """Pick a global best-F1 threshold plus per-segment overrides with enough support.
+
+    Segment thresholds are shrunk toward the global one with weight ``support / (support + min_support)``.
+    """
+    best = best_operating_points(sweep)
+    default = float(best.loc[ALL_SEGMENTS, "threshold"])
+    segments = best.drop(index=[ALL_SEGMENTS, MISSING_SEGMENT], errors="ignore")
+    eligible = segments[(segments["support"] >= min_support) & segments["auc"].notna()]
+    weight = eligible["support"] / (eligible["support"] + min_support)
+    shrunk = weight * eligible["threshold"] + (1 - weight) * default
+    return {
+        "default": default,
+        "segments": {str(k): float(v) for k, v in shrunk.items()},
+    }
+
+
+def apply_thresholds(y_prob: np.ndarray, thresholds: Dict, segments: Optional[np.ndarray] = None) -> np.ndarray:
+    y_prob = np.asarray(y_prob, dtype=float)
+    default = thresholds.get("default", config.DEFAULT_THRESHOLD)
+    cutoffs = np.full(len(y_prob), default)
+    if segments is not None and thresholds.get("segments"):
+        mapped = canonical_ids(pd.Series(np.asarray(segments))).map(thresholds["segments"])
+        cutoffs = mapped.fillna(default).to_numpy(dtype=float)
+    return (y_prob >= cutoffs).astype(int)
+
+
+def decision_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    """Precision/recall/F1 of hard 0/1 decisions, e.g. from ``apply_thresholds``."""
+    y_true = np.asarray(y_true).astype(int)
+    y_pred = np.asarray(y_pred).astype(int)
+    tp = int((y_true & y_pred).sum())
+    fp = int(((1 - y_true) & y_pred).sum())
+    pos = int(y_true.sum())
+    return {
+        "precision": float(_safe_div(tp, tp + fp)),
+        "recall": float(_safe_div(tp, pos)),
+        "f1": float(_safe_div(2 * tp, tp + fp + pos)),
+    }
+
+
+def evaluate_predictions(y_true: np.ndarray, y_prob: np.ndarray, threshold: float = config.DEFAULT_THRESHOLD) -> Dict[str, float]:
+    return sweep_metrics(threshold_sweep(y_true, y_prob), threshold)
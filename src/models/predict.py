@@ -7,7 +7,7 @@ from scipy.sparse import csr_matrix, hstack
 
 from src import config
 from src.features.build_features import build_feature_matrix
-from src.utils import mlflow_utils
+from src.utils import mlflow_utils, model_cache
 
 
 def load_production_model():
@@ -16,8 +16,7 @@ def load_production_model():
     prods = client.get_latest_versions(config.MLFLOW_MODEL_NAME, stages=["Production"])
     if not prods:
         raise RuntimeError("No production model found")
-    model_uri = prods[0].source
-    return mlflow.lightgbm.load_model(model_uri)
+    return model_cache.load_registered_model(prods[0].version, prods[0].run_id, prods[0].source)
 
 
 def predict(df_features):
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
 import lightgbm as lgb
 import mlflow
@@ -11,11 +11,26 @@ import numpy as np
 from imblearn.over_sampling import RandomOverSampler
 from imblearn.under_sampling import RandomUnderSampler
 from scipy.sparse import csr_matrix, hstack
-from sklearn.metrics import f1_score, precision_recall_fscore_support, roc_auc_score
 from sklearn.model_selection import train_test_split
 
 from src import config
-from src.utils import mlflow_utils
+from src.models.distributed import train_distributed
+from src.models.evaluate import apply_thresholds, decision_metrics, select_thresholds, sweep_metrics, threshold_sweep
+from src.utils import mlflow_utils, model_cache
+
+
+LGB_PARAMS = {
+    "objective": "binary",
+    "metric": "auc",
+    "learning_rate": 0.05,
+    "num_leaves": 31,
+    "feature_fraction": 0.9,
+    "bagging_fraction": 0.8,
+    "bagging_freq": 5,
+    "seed": config.SEED,
+    "deterministic": True,
+    "verbose": -1,
+}
 
 
 def handle_imbalance(X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
@@ -31,70 +46,105 @@ def handle_imbalance(X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarr
     return X_res, y_res
 
 
-def train_model(X_sparse: csr_matrix, X_numeric: np.ndarray, y: np.ndarray) -> Dict:
+def checkpoint_callback(env):
+    iteration = env.iteration
+    if iteration % 50 == 0 and iteration > 0:
+        checkpoint_path = Path(config.CHECKPOINT_DIR) / f"model_iter_{iteration}.txt"
+        env.model.save_model(checkpoint_path)
+
+
+def training_callbacks(
+    learning_rate: float,
+    verbose: bool = True,
+    early_stopping_rounds: Optional[int] = 30,
+    eval_result: Optional[Dict] = None,
+) -> List[Callable]:
+    """Callbacks shared by single-process and distributed training; ``verbose`` adds logging and checkpoints.
+
+    Per-iteration metrics are recorded into ``eval_result`` when given.
+    """
+    callbacks = [
+        lgb.record_evaluation(eval_result if eval_result is not None else {}),
+        lgb.reset_parameter(learning_rate=lambda current_iter: learning_rate * (0.99 ** current_iter)),
+    ]
+    if early_stopping_rounds:
+        callbacks.append(lgb.early_stopping(early_stopping_rounds, verbose=False))
+    if verbose:
+        callbacks += [lgb.log_evaluation(period=10), checkpoint_callback]
+    return callbacks
+
+
+def log_training_history(model: lgb.Booster, eval_result: Dict) -> None:
+    """Log what ``mlflow.lightgbm.autolog`` records for in-process training: per-iteration
+    metrics and split/gain feature importance. Used when training ran in worker processes.
+
+    Rank 0's "training" metrics cover only its shard, so they get a ``rank0-`` prefix rather
+    than autolog's full-training-set names; validation metrics use the full set and keep theirs.
+    """
+    for data_name, metrics in eval_result.items():
+        prefix = "rank0-" if data_name == "training" else ""
+        for metric_name, values in metrics.items():
+            for step, value in enumerate(values):
+                mlflow.log_metric(f"{prefix}{data_name}-{metric_name}", value, step=step)
+    for importance_type in ["split", "gain"]:
+        importance = model.feature_importance(importance_type=importance_type)
+        mlflow.log_dict(
+            {name: float(v) for name, v in zip(model.feature_name(), importance)},
+            f"feature_importance_{importance_type}.json",
+        )
+
+
+def train_model(
+    X_sparse: csr_matrix,
+    X_numeric: np.ndarray,
+    y: np.ndarray,
+    segments: Optional[np.ndarray] = None,
+    num_workers: int = config.TRAIN_NUM_WORKERS,
+    partition_keys: Optional[np.ndarray] = None,
+) -> Dict:
     mlflow_utils.setup_mlflow()
     mlflow.lightgbm.autolog()
 
     X_combined = hstack([csr_matrix(X_numeric), X_sparse]).tocsr()
     stratify = y if min(np.bincount(y)) >= 2 else None
-    X_train, X_val, y_train, y_val = train_test_split(
-        X_combined, y, test_size=0.2, random_state=config.SEED, stratify=stratify
+    split_segments = segments if segments is not None else np.zeros(len(y), dtype=int)
+    split_keys = partition_keys if partition_keys is not None else np.zeros(len(y), dtype=int)
+    X_train, X_val, y_train, y_val, seg_train, seg_val, keys_train, _ = train_test_split(
+        X_combined, y, split_segments, split_keys, test_size=0.2, random_state=config.SEED, stratify=stratify
     )
-    X_train_bal, y_train_bal = handle_imbalance(X_train, y_train)
-
-    lgb_train = lgb.Dataset(X_train_bal, label=y_train_bal)
-    lgb_val = lgb.Dataset(X_val, label=y_val, reference=lgb_train)
-
-    params = {
-        "objective": "binary",
-        "metric": "auc",
-        "learning_rate": 0.05,
-        "num_leaves": 31,
-        "feature_fraction": 0.9,
-        "bagging_fraction": 0.8,
-        "bagging_freq": 5,
-        "seed": config.SEED,
-        "deterministic": True,
-        "verbose": -1,
-    }
-
-    os.makedirs(config.CHECKPOINT_DIR, exist_ok=True)
 
-    callbacks = [
-        lgb.record_evaluation({}),
-        lgb.early_stopping(30, verbose=False),
-        lgb.log_evaluation(period=10),
-        lgb.reset_parameter(learning_rate=lambda current_iter: 0.05 * (0.99 ** current_iter)),
-    ]
+    params = dict(LGB_PARAMS)
 
-    # Custom checkpointing
-    def callback(env):
-        iteration = env.iteration
-        if iteration % 50 == 0 and iteration > 0:
-            checkpoint_path = Path(config.CHECKPOINT_DIR) / f"model_iter_{iteration}.txt"
-            env.model.save_model(checkpoint_path)
-
-    callbacks.append(callback)
+    os.makedirs(config.CHECKPOINT_DIR, exist_ok=True)
 
     with mlflow.start_run() as run:
-        model = lgb.train(
-            params,
-            lgb_train,
-            valid_sets=[lgb_train, lgb_val],
-            num_boost_round=500,
-            callbacks=callbacks,
-        )
+        if num_workers > 1:
+            # autolog only patches lgb.train in this process, so log rank 0's history explicitly
+            model, eval_result = train_distributed(
+                X_train, y_train, X_val, y_val, params, num_workers, partition_keys=keys_train if partition_keys is not None else None
+            )
+            log_training_history(model, eval_result)
+        else:
+            X_train_bal, y_train_bal = handle_imbalance(X_train, y_train)
+            lgb_train = lgb.Dataset(X_train_bal, label=y_train_bal)
+            lgb_val = lgb.Dataset(X_val, label=y_val, reference=lgb_train)
+            model = lgb.train(
+                params,
+                lgb_train,
+                valid_sets=[lgb_train, lgb_val],
+                num_boost_round=500,
+                callbacks=training_callbacks(params["learning_rate"]),
+            )
 
         val_pred = model.predict(X_val)
-        val_label = (val_pred >= 0.5).astype(int)
-
-        metrics = {
-            "val_auc": float(roc_auc_score(y_val, val_pred)),
-            "val_precision": float(precision_recall_fscore_support(y_val, val_label, average="binary")[0]),
-            "val_recall": float(precision_recall_fscore_support(y_val, val_label, average="binary")[1]),
-            "val_f1": float(f1_score(y_val, val_label)),
-        }
-        mlflow_utils.log_params_and_metrics(params, metrics)
+        sweep = threshold_sweep(y_val, val_pred, seg_val if segments is not None else None)
+        metrics = {f"val_{k}": v for k, v in sweep_metrics(sweep).items()}
+        thresholds = select_thresholds(sweep)
+        metrics["val_best_threshold"] = thresholds["default"]
+        # val_* above use the fixed 0.5 cutoff; val_served_* use the thresholds serving applies
+        served = apply_thresholds(val_pred, thresholds, seg_val if segments is not None else None)
+        metrics.update({f"val_served_{k}": v for k, v in decision_metrics(y_val, served).items()})
+        mlflow_utils.log_params_and_metrics({**params, "num_workers": num_workers}, metrics)
 
         model_path = Path(config.MODEL_DIR)
         model_path.mkdir(parents=True, exist_ok=True)
@@ -103,8 +153,11 @@ def train_model(X_sparse: csr_matrix, X_numeric: np.ndarray, y: np.ndarray) -> D
         mlflow.log_artifact(saved_model)
 
         mlflow.lightgbm.log_model(model, artifact_path="model")
+        mlflow.log_dict(thresholds, "model/thresholds.json")
         model_uri = f"runs:/{run.info.run_id}/model"
         version = mlflow_utils.register_and_transition(model_uri, stage="Staging")
+        model_cache.put_model(model_cache.run_key(run.info.run_id), model)
+        model_cache.put_model(model_cache.registry_key(config.MLFLOW_MODEL_NAME, str(version), run.info.run_id), model)
         metrics["model_version"] = version
         metrics["run_id"] = run.info.run_id
         return metrics
@@ -8,11 +8,12 @@ from typing import Dict
 
 from src import config
 from src.features.build_features import build_feature_matrix, create_label
-from src.utils import mlflow_utils, monitoring
+from src.utils import mlflow_utils, model_cache, monitoring
 
 
 def run_cme(df_sales: pd.DataFrame, df_stock: pd.DataFrame, reference_preds: pd.Series, horizon_days: int = config.DEFAULT_HORIZON_DAYS) -> Dict:
     mlflow_utils.setup_mlflow()
+    # raw IDs: features are built once here, so interning them first would only add a pass
     labeled = create_label(df_sales, df_stock, horizon_days)
     X_sparse, X_numeric, y, _ = build_feature_matrix(labeled)
     _ = (X_sparse, X_numeric, y)  # placeholders for potential future use
@@ -35,6 +36,10 @@ def run_cme(df_sales: pd.DataFrame, df_stock: pd.DataFrame, reference_preds: pd.
             baseline_rule = labeled.apply(
                 lambda row: int(row["CurrentQuantity"] < row["SafetyStockLevel"]), axis=1
             ).tolist()
+        else:
+            # warm the shared cache so serving/predict pick up the rolled-back model from disk
+            mv = mlflow.MlflowClient().get_model_version(config.MLFLOW_MODEL_NAME, str(rollback_version))
+            model_cache.load_registered_model(mv.version, mv.run_id, mv.source)
     return {
         "psi": psi,
         "kl": kl,
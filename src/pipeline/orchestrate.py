@@ -5,15 +5,28 @@ from pathlib import Path
 from prefect import flow
 
 from src import config
-from src.pipeline.steps import ingest_data, validate_data, engineer_features, train, evaluate_run, promote_if_good
+from src.pipeline.steps import (
+    aggregate_movement_features,
+    engineer_features,
+    evaluate_run,
+    ingest_data,
+    promote_if_good,
+    train,
+    validate_data,
+)
 
 
 @flow(name="stockout-pipeline")
-def run_pipeline(data_dir: Path = config.SAMPLE_DATA_DIR, horizon_days: int = config.DEFAULT_HORIZON_DAYS):
+def run_pipeline(
+    data_dir: Path = config.SAMPLE_DATA_DIR,
+    horizon_days: int = config.DEFAULT_HORIZON_DAYS,
+    num_workers: int = config.TRAIN_NUM_WORKERS,
+):
     datasets = ingest_data(data_dir)
     datasets = validate_data(datasets)
-    features = engineer_features(datasets, horizon_days)
-    metrics = train(features)
+    movement = aggregate_movement_features(datasets)
+    features = engineer_features(datasets, horizon_days, movement)
+    metrics = train(features, num_workers)
     eval_metrics = evaluate_run(features, metrics)
     status = promote_if_good(metrics)
     return {"train_metrics": metrics, "eval_metrics": eval_metrics, "status": status}
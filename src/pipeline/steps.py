@@ -4,16 +4,15 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Dict
 
-import mlflow
 import pandas as pd
 from prefect import task
 from scipy.sparse import csr_matrix, hstack
 
 from src import config
-from src.features.build_features import build_feature_matrix, create_label
+from src.features.build_features import aggregate_movement, build_feature_matrix, create_label
 from src.models.train import train_model
 from src.models.evaluate import evaluate_predictions
-from src.utils import io, validation, mlflow_utils
+from src.utils import encoding, io, validation, mlflow_utils, model_cache
 
 
 @task
@@ -21,12 +20,18 @@ def ingest_data(data_dir: Path) -> Dict[str, pd.DataFrame]:
     sales = io.read_csv_full(data_dir / "sales_transactions.csv")
     stock = io.read_csv_full(data_dir / "stock_current.csv")
     movement = io.read_csv_full(data_dir / "stock_movement.csv")
-    return {"sales": sales, "stock": stock, "movement": movement}
+    masters = [io.read_csv_full(data_dir / name) for name in ("branches.csv", "item_master.csv") if (data_dir / name).exists()]
+    vocab = encoding.build_vocabulary([sales, stock, movement, *masters])
+    data = {name: encoding.encode_frame(df, vocab) for name, df in {"sales": sales, "stock": stock, "movement": movement}.items()}
+    data["vocab"] = vocab
+    return data
 
 
 @task
 def validate_data(data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
     for name, df in data.items():
+        if not isinstance(df, pd.DataFrame):
+            continue
         key = name
         if name == "sales":
             key = "sales_transactions"
@@ -39,22 +44,37 @@ def validate_data(data: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
 
 
 @task
-def engineer_features(data: Dict[str, pd.DataFrame], horizon_days: int):
-    labeled = create_label(data["sales"], data["stock"], horizon_days, data.get("movement"))
-    X_sparse, X_numeric, y, feature_names = build_feature_matrix(labeled)
-    return {"X_sparse": X_sparse, "X_numeric": X_numeric, "y": y, "feature_names": feature_names, "df": labeled}
+def aggregate_movement_features(data: Dict[str, pd.DataFrame]):
+    if data.get("movement") is None:
+        return None
+    return aggregate_movement(data["movement"], data["stock"])
+
+
+@task
+def engineer_features(data: Dict[str, pd.DataFrame], horizon_days: int, movement: pd.DataFrame | None = None):
+    labeled = create_label(data["sales"], data["stock"], horizon_days, movement)
+    X_sparse, X_numeric, y, feature_names = build_feature_matrix(labeled, data.get("vocab"))
+    return {"X_sparse": X_sparse, "X_numeric": X_numeric, "y": y, "feature_names": feature_names, "df": labeled, "vocab": data.get("vocab")}
 
 
 @task
-def train(features: Dict[str, object]):
-    return train_model(features["X_sparse"], features["X_numeric"], features["y"])
+def train(features: Dict[str, object], num_workers: int = config.TRAIN_NUM_WORKERS):
+    segments = features["df"][config.THRESHOLD_SEGMENT_COL]
+    if features.get("vocab") is not None:
+        # thresholds are served by raw ID, so decode the segment keys here
+        segments = encoding.decode(segments, features["vocab"], encoding.KEY_COLUMNS[config.THRESHOLD_SEGMENT_COL])
+    segments = segments.to_numpy()
+    # partitioning only groups rows, so the (possibly encoded) column is used as is
+    partition_keys = features["df"][config.TRAIN_PARTITION_COL].to_numpy()
+    return train_model(
+        features["X_sparse"], features["X_numeric"], features["y"], segments, num_workers=num_workers, partition_keys=partition_keys
+    )
 
 
 @task
 def evaluate_run(features: Dict[str, object], metrics: Dict[str, float]):
     X_combined = hstack([csr_matrix(features["X_numeric"]), features["X_sparse"]]).tocsr()
-    model_uri = f"runs:/{metrics['run_id']}/model"
-    model = mlflow.lightgbm.load_model(model_uri)
+    model = model_cache.load_run_model(metrics["run_id"])
     preds = model.predict(X_combined)
     eval_metrics = evaluate_predictions(features["y"], preds)
     mlflow_utils.log_params_and_metrics({}, {f"eval_{k}": v for k, v in eval_metrics.items()})
@@ -63,7 +83,8 @@ def evaluate_run(features: Dict[str, object], metrics: Dict[str, float]):
 
 @task
 def promote_if_good(metrics: Dict[str, float]):
-    if metrics.get("val_f1", 0) >= config.ACCEPTANCE_THRESHOLD:
+    # gate on F1 under the served (tuned) thresholds; runs logged before they existed only have val_f1
+    if metrics.get("val_served_f1", metrics.get("val_f1", 0)) >= config.ACCEPTANCE_THRESHOLD:
         mlflow_utils.promote_to_production(str(int(metrics.get("model_version"))))
         return "promoted"
     return "staging"
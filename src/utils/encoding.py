@@ -0,0 +1,74 @@
+"""Dictionary encoding of branch and item identifiers to compact int32 codes."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable
+
+
+KEY_COLUMNS = {"BranchID": "branch", "FromBranchID": "branch", "ToBranchID": "branch", "ItemCode": "item"}
+
+
+def canonical_ids(series: pd.Series) -> pd.Series:
+    """IDs as strings, missing kept as NaN; integral floats (int columns with NaNs) lose their ``.0``."""
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if (values == np.floor(values)).all():
+            series = series.astype("Int64")
+    return series.astype(str).where(series.notna())
+
+
+def build_vocabulary(frames: Iterable[pd.DataFrame]) -> Dict[str, pd.Index]:
+    """Collect every branch and item ID seen in ``frames`` into sorted, de-duplicated indexes.
+
+    Per-code feature hashes are computed here, once per ingestion, under ``"<kind>_hashes"``.
+    """
+    # deferred: src.utils.hashing imports this module
+    from src.utils.hashing import value_hashes
+
+    values: Dict[str, list] = {"branch": [], "item": []}
+    for df in frames:
+        for col, kind in KEY_COLUMNS.items():
+            if col in df.columns:
+                values[kind].append(canonical_ids(df[col]).dropna().unique())
+    vocab = {
+        kind: pd.Index(np.unique(np.concatenate(parts)) if parts else np.array([], dtype=object), dtype=object)
+        for kind, parts in values.items()
+    }
+    vocab.update({f"{kind}_hashes": value_hashes(vocab[kind]) for kind in values})
+    return vocab
+
+
+def code_hashes(vocab: Dict[str, pd.Index], kind: str) -> np.ndarray:
+    """Feature hash of every code of ``kind``, as computed by ``build_vocabulary``."""
+    return vocab[f"{kind}_hashes"]
+
+
+def encode(series: pd.Series, vocab: Dict[str, pd.Index], kind: str) -> np.ndarray:
+    """Map IDs to int32 codes; missing or unknown IDs become -1."""
+    ids = canonical_ids(series)
+    codes = vocab[kind].get_indexer(ids)
+    codes[ids.isna().to_numpy()] = -1
+    return codes.astype(np.int32)
+
+
+def decode(codes, vocab: Dict[str, pd.Index], kind: str) -> pd.Series:
+    """Map int codes back to IDs; code -1 decodes to None."""
+    lookup = np.append(vocab[kind].to_numpy(dtype=object), None)
+    return pd.Series(lookup[np.asarray(codes)], dtype=object)
+
+
+def encode_frame(df: pd.DataFrame, vocab: Dict[str, pd.Index]) -> pd.DataFrame:
+    df = df.copy()
+    for col, kind in KEY_COLUMNS.items():
+        if col in df.columns:
+            df[col] = encode(df[col], vocab, kind)
+    return df
+
+
+def decode_frame(df: pd.DataFrame, vocab: Dict[str, pd.Index]) -> pd.DataFrame:
+    df = df.copy()
+    for col, kind in KEY_COLUMNS.items():
+        if col in df.columns:
+            df[col] = decode(df[col].to_numpy(), vocab, kind).to_numpy()
+    return df
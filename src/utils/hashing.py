@@ -5,7 +5,12 @@ import hashlib
 import numpy as np
 import pandas as pd
 from scipy.sparse import csr_matrix, hstack
-from typing import List
+from typing import List, Sequence
+
+from src.utils.encoding import canonical_ids
+
+
+_UNKNOWN = "<unknown>"
 
 
 def _hash_value(value: str, space: int) -> int:
@@ -13,16 +18,53 @@ def _hash_value(value: str, space: int) -> int:
     return int(digest, 16) % space
 
 
+def value_hashes(values: Sequence) -> np.ndarray:
+    """Stable 64-bit hash per distinct value; ``% space`` matches ``_hash_value`` for power-of-two spaces."""
+    return np.array([_hash_value(v, 2 ** 64) for v in values], dtype=np.uint64)
+
+
+def _mix(h: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer; uint64 arithmetic wraps on overflow
+    h = h ^ (h >> np.uint64(33))
+    h = h * np.uint64(0xFF51AFD7ED558CCD)
+    return h ^ (h >> np.uint64(33))
+
+
+def _lookup(codes: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    # code -1 (missing or unknown ID) picks the trailing sentinel hash, for raw and encoded inputs alike
+    return np.append(hashes, value_hashes([_UNKNOWN]))[np.asarray(codes)]
+
+
+def _one_hot(indices: np.ndarray, space: int) -> csr_matrix:
+    data = np.ones(len(indices))
+    indptr = np.arange(len(indices) + 1)
+    return csr_matrix((data, indices.astype(np.int64), indptr), shape=(len(indices), space))
+
+
+def hash_codes(codes: np.ndarray, hashes: np.ndarray, space: int) -> csr_matrix:
+    """Hash integer codes whose per-value hashes are ``hashes[code]``."""
+    return _one_hot(_lookup(codes, hashes) % np.uint64(space), space)
+
+
+def hash_code_cross(codes_a: np.ndarray, hashes_a: np.ndarray, codes_b: np.ndarray, hashes_b: np.ndarray, space: int) -> csr_matrix:
+    """Hash the cross of two coded columns arithmetically, without building per-row strings."""
+    with np.errstate(over="ignore"):
+        crossed = _mix(_lookup(codes_a, hashes_a) * np.uint64(0x9E3779B97F4A7C15) + _lookup(codes_b, hashes_b))
+    return _one_hot(crossed % np.uint64(space), space)
+
+
+def factorize_ids(series: pd.Series):
+    """Codes and per-value hashes for raw IDs; missing IDs get code -1."""
+    codes, uniques = pd.factorize(canonical_ids(series))
+    return codes, value_hashes(uniques)
+
+
 def hash_categorical(series: pd.Series, space: int) -> csr_matrix:
-    indices = series.apply(lambda x: _hash_value(x, space)).to_numpy()
-    data = np.ones(len(series))
-    indptr = np.arange(len(series) + 1)
-    return csr_matrix((data, indices, indptr), shape=(len(series), space))
+    return hash_codes(*factorize_ids(series), space)
 
 
 def hash_feature_cross(series_a: pd.Series, series_b: pd.Series, space: int) -> csr_matrix:
-    crossed = series_a.astype(str) + "_x_" + series_b.astype(str)
-    return hash_categorical(crossed, space)
+    return hash_code_cross(*factorize_ids(series_a), *factorize_ids(series_b), space)
 
 
 def stack_sparse(matrices: List[csr_matrix]) -> csr_matrix:
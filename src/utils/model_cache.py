@@ -0,0 +1,161 @@
+"""Shared on-disk LightGBM model cache keyed by registry version or run ID.
+
+Model files are content-addressed (``models/<sha256 of model text>.txt``); registry
+and run keys are small alias files under ``keys/`` naming the model they point to,
+so one booster registered under several keys is stored once.
+"""
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import lightgbm as lgb
+import mlflow
+
+from src import config
+
+
+_MEMORY: "OrderedDict[str, lgb.Booster]" = OrderedDict()
+_MEMORY_LOCK = threading.Lock()
+
+
+def registry_key(name: str, version: str, run_id: str) -> str:
+    # version numbers restart when a registry is reset and repeat across tracking servers; run IDs do not
+    return f"registry:{name}:{version}:{run_id}"
+
+
+def run_key(run_id: str) -> str:
+    return f"run:{run_id}"
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _model_dir() -> Path:
+    return Path(config.MODEL_CACHE_DIR) / "models"
+
+
+def _key_path(key: str) -> Path:
+    return Path(config.MODEL_CACHE_DIR) / "keys" / _sha256(key)
+
+
+@contextmanager
+def _locked() -> Iterator[None]:
+    """Exclusive cross-process lock on the whole cache directory, held for writes and eviction."""
+    cache_dir = Path(config.MODEL_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(cache_dir / ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as tmp:
+            tmp.write(text)
+        os.replace(tmp_name, path)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+
+def _remember(key: str, booster: lgb.Booster) -> None:
+    with _MEMORY_LOCK:
+        _MEMORY[key] = booster
+        _MEMORY.move_to_end(key)
+        while len(_MEMORY) > config.MODEL_CACHE_MEMORY_ENTRIES:
+            _MEMORY.popitem(last=False)
+
+
+def _recall(key: str) -> Optional[lgb.Booster]:
+    with _MEMORY_LOCK:
+        booster = _MEMORY.get(key)
+        if booster is not None:
+            _MEMORY.move_to_end(key)
+        return booster
+
+
+def get_model(key: str) -> Optional[lgb.Booster]:
+    """Return a cached booster from memory or disk, or None on a miss."""
+    booster = _recall(key)
+    if booster is not None:
+        return booster
+    try:
+        path = _model_dir() / f"{_key_path(key).read_text().strip()}.txt"
+        booster = lgb.Booster(model_file=str(path))
+        os.utime(path)  # refresh recency for eviction
+    except (lgb.basic.LightGBMError, FileNotFoundError):
+        return None
+    _remember(key, booster)
+    return booster
+
+
+def put_model(key: str, booster: lgb.Booster) -> Path:
+    """Store a booster under ``key``; files appear atomically for other processes."""
+    _remember(key, booster)
+    model_text = booster.model_to_string()
+    digest = _sha256(model_text)
+    path = _model_dir() / f"{digest}.txt"
+    with _locked():
+        if path.exists():
+            os.utime(path)  # a new alias makes the shared file most recently used
+        else:
+            _atomic_write(path, model_text)
+        _atomic_write(_key_path(key), digest)
+    evict(keep=path)
+    return path
+
+
+def evict(max_bytes: Optional[int] = None, keep: Optional[Path] = None) -> None:
+    """Drop least recently used model files until the cache fits in ``max_bytes``, then dangling keys.
+
+    ``keep`` (the file just stored) is never dropped, even if it alone exceeds ``max_bytes``.
+    """
+    max_bytes = config.MODEL_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not Path(config.MODEL_CACHE_DIR).exists():
+        return
+    with _locked():
+        entries = sorted((p.stat().st_mtime, p.stat().st_size, p) for p in _model_dir().glob("*.txt"))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink()
+            total -= size
+        for alias in Path(config.MODEL_CACHE_DIR).glob("keys/*"):
+            if not (_model_dir() / f"{alias.read_text().strip()}.txt").exists():
+                alias.unlink()
+
+
+def load_cached(key: str, model_uri: str) -> lgb.Booster:
+    """Return the booster for ``key``, downloading ``model_uri`` from MLflow only on a miss."""
+    booster = get_model(key)
+    if booster is None:
+        booster = mlflow.lightgbm.load_model(model_uri)
+        put_model(key, booster)
+    return booster
+
+
+def load_registered_model(version: str, run_id: str, source: Optional[str] = None, name: str = config.MLFLOW_MODEL_NAME) -> lgb.Booster:
+    if source is None:
+        source = f"models:/{name}/{version}"
+    return load_cached(registry_key(name, str(version), run_id), source)
+
+
+def load_run_model(run_id: str) -> lgb.Booster:
+    return load_cached(run_key(run_id), f"runs:/{run_id}/model")
@@ -1,5 +1,6 @@
+import pytest
 import pandas as pd
-from src.features.build_features import create_label, build_feature_matrix
+from src.features.build_features import aggregate_movement, create_label, build_feature_matrix
 
 
 def test_label_creation():
@@ -48,3 +49,67 @@ def test_build_feature_matrix_shapes():
     X_sparse, X_numeric, y, _ = build_feature_matrix(df)
     assert X_sparse.shape[0] == df.shape[0]
     assert len(y) == df.shape[0]
+
+
+def test_movement_windows_relative_to_snapshot():
+    movement = pd.DataFrame(
+        {
+            "MovementID": ["M1", "M2", "M3"],
+            "Date": pd.to_datetime(["2024-03-30", "2024-03-10", "2024-04-05"], utc=True),
+            "FromBranchID": ["B2", "B1", "B2"],
+            "FromBranchName": ["North", "Central", "North"],
+            "ToBranchID": ["B1", "B2", "B1"],
+            "ToBranchName": ["Central", "North", "Central"],
+            "ItemCode": ["ITM1", "ITM1", "ITM1"],
+            "ItemName": ["A", "A", "A"],
+            "QuantityMoved": [10, 4, 7],
+        }
+    )
+    stock = pd.DataFrame(
+        {
+            "BranchID": ["B1", "B3"],
+            "ItemCode": ["ITM1", "ITM1"],
+            "LastUpdatedAt": pd.to_datetime(["2024-04-01", "2024-04-01"], utc=True),
+        }
+    )
+    features = aggregate_movement(movement, stock)
+    b1 = features.iloc[0]
+    assert b1["inflow_7d"] == 10 and b1["outflow_7d"] == 0
+    assert b1["net_movement_30d"] == 10 - 4
+    assert b1["net_movement"] == 10 - 4 + 7
+    assert (features.iloc[1] == 0).all()
+
+
+def test_encoded_and_raw_features_match():
+    from src.utils import encoding
+
+    df = pd.DataFrame(
+        {
+            "BranchID": ["B1", "B2", "B1", None],
+            "ItemCode": ["ITM1", "ITM2", "ITM2", "ITM1"],
+            "CurrentQuantity": [50, 60, 70, 80],
+            "ReservedQuantity": [5, 10, 0, 0],
+            "SafetyStockLevel": [30, 20, 40, 10],
+            "future_sales": [10, 5, 0, 3],
+            "projected_stock": [35, 45, 70, 77],
+            "LastUpdatedAt": pd.to_datetime(["2024-01-02", "2024-02-02", "2024-03-02", "2024-04-02"], utc=True),
+            "label_stockout": [0, 1, 0, 0],
+        }
+    )
+    vocab = encoding.build_vocabulary([df])
+    raw_sparse, _, _, _ = build_feature_matrix(df)
+    enc_sparse, _, _, _ = build_feature_matrix(encoding.encode_frame(df, vocab), vocab)
+    assert (raw_sparse != enc_sparse).nnz == 0
+
+
+def test_build_feature_matrix_requires_core_columns():
+    df = pd.DataFrame(
+        {
+            "BranchID": ["B1"],
+            "ItemCode": ["ITM1"],
+            "LastUpdatedAt": pd.to_datetime(["2024-01-02"], utc=True),
+            "label_stockout": [0],
+        }
+    )
+    with pytest.raises(KeyError):
+        build_feature_matrix(df)
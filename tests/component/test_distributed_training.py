@@ -0,0 +1,49 @@
+import time
+
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+from src import config
+from src.models.benchmark_distributed import synthetic_design
+from src.models.distributed import partition_rows, train_distributed
+from src.models.evaluate import evaluate_predictions
+from src.models.train import LGB_PARAMS
+
+
+def test_partition_rows_by_key_covers_all_rows():
+    keys = np.array([f"B{i % 16}" for i in range(200)])
+    parts = partition_rows(keys, len(keys), 2)
+    assert sorted(np.concatenate(parts).tolist()) == list(range(200))
+    for part in parts:
+        assert not set(keys[part]) & set(keys[np.setdiff1d(np.arange(200), part)])
+
+
+def test_two_local_workers_produce_one_booster():
+    X, y, branches = synthetic_design(2000, n_branches=16, sparse_cols=64)
+    model, history = train_distributed(
+        X[:1600], y[:1600], X[1600:], y[1600:], LGB_PARAMS, 2, partition_keys=branches[:1600], num_boost_round=20, verbose=False
+    )
+    assert model.num_trees() > 0
+    assert len(history["valid_1"]["auc"]) == 20
+    assert evaluate_predictions(y[1600:], model.predict(X[1600:]))["auc"] > 0.7
+
+
+def test_shard_with_one_class_still_trains():
+    X, y, branches = synthetic_design(2000, n_branches=16, sparse_cols=64)
+    y = y.copy()
+    y[partition_rows(branches, len(branches), 2)[1]] = 0
+    model, _ = train_distributed(X, y, X, y, LGB_PARAMS, 2, partition_keys=branches, num_boost_round=10, verbose=False)
+    assert model.num_trees() > 0
+
+
+def test_failing_rank_aborts_the_run_promptly():
+    X, y, branches = synthetic_design(2000, n_branches=16, sparse_cols=64)
+    y = y.copy()
+    # only rank 1 sees a label cross_entropy rejects; rank 0 would otherwise wait on the network
+    y[partition_rows(branches, len(branches), 2)[1][:5]] = 2
+    params = {**LGB_PARAMS, "objective": "cross_entropy"}
+    start = time.perf_counter()
+    with pytest.raises(lgb.basic.LightGBMError):
+        train_distributed(X, y, X, np.zeros_like(y), params, 2, partition_keys=branches, num_boost_round=10, verbose=False)
+    assert time.perf_counter() - start < 60 * config.TRAIN_NETWORK_TIMEOUT_MINUTES / 2
@@ -0,0 +1,31 @@
+import pandas as pd
+from src.utils import encoding
+
+
+def test_encode_decode_roundtrip():
+    sales = pd.DataFrame({"BranchID": ["B2", "B1"], "ItemCode": ["ITM1", None]})
+    movement = pd.DataFrame({"FromBranchID": ["B3"], "ToBranchID": ["B1"], "ItemCode": ["ITM2"]})
+    vocab = encoding.build_vocabulary([sales, movement])
+    encoded = encoding.encode_frame(sales, vocab)
+    assert encoded["BranchID"].dtype == "int32"
+    assert encoded["ItemCode"].tolist()[1] == -1
+    decoded = encoding.decode_frame(encoded, vocab)
+    assert decoded["BranchID"].tolist() == ["B2", "B1"]
+    assert decoded["ItemCode"].tolist() == ["ITM1", None]
+
+
+def test_int_and_float_ids_share_codes():
+    stock = pd.DataFrame({"BranchID": [101, 102]})
+    movement = pd.DataFrame({"FromBranchID": [101.0, None], "ToBranchID": [102.0, 103.0]})
+    vocab = encoding.build_vocabulary([stock, movement])
+    assert vocab["branch"].tolist() == ["101", "102", "103"]
+    assert encoding.encode(stock["BranchID"], vocab, "branch").tolist() == [0, 1]
+    assert encoding.encode(movement["FromBranchID"], vocab, "branch").tolist() == [0, -1]
+
+
+def test_vocabulary_carries_per_code_hashes():
+    from src.utils.hashing import value_hashes
+
+    vocab = encoding.build_vocabulary([pd.DataFrame({"BranchID": ["B2", "B1"], "ItemCode": ["ITM1", "ITM2"]})])
+    assert (encoding.code_hashes(vocab, "branch") == value_hashes(["B1", "B2"])).all()
+    assert len(encoding.code_hashes(vocab, "item")) == len(vocab["item"])
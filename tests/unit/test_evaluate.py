@@ -0,0 +1,85 @@
+import numpy as np
+from sklearn.metrics import precision_recall_fscore_support, roc_auc_score
+
+from src.models.evaluate import (
+    MISSING_SEGMENT,
+    apply_thresholds,
+    best_operating_points,
+    decision_metrics,
+    evaluate_predictions,
+    segment_metrics,
+    select_thresholds,
+    threshold_sweep,
+)
+
+
+def _sample(n=200):
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 2, n)
+    prob = np.round(np.clip(0.3 * y + rng.random(n) * 0.7, 0, 1), 2)
+    segments = rng.choice(["B1", "B2", "B3"], n)
+    return y, prob, segments
+
+
+def test_sweep_matches_sklearn_at_every_threshold():
+    y, prob, _ = _sample()
+    sweep = threshold_sweep(y, prob)
+    for row in sweep.iloc[::10].itertuples():
+        p, r, f, _ = precision_recall_fscore_support(y, (prob >= row.threshold).astype(int), average="binary", zero_division=0)
+        assert np.isclose(row.precision, p) and np.isclose(row.recall, r) and np.isclose(row.f1, f)
+    metrics = evaluate_predictions(y, prob)
+    p, r, f, _ = precision_recall_fscore_support(y, (prob >= 0.5).astype(int), average="binary")
+    assert np.allclose([metrics["precision"], metrics["recall"], metrics["f1"]], [p, r, f])
+    assert np.isclose(metrics["auc"], roc_auc_score(y, prob))
+
+
+def test_segment_metrics_match_per_segment_evaluation():
+    y, prob, segments = _sample()
+    per_segment = segment_metrics(y, prob, segments)
+    for seg in ["B1", "B2", "B3"]:
+        mask = segments == seg
+        assert np.isclose(per_segment.loc[seg, "auc"], roc_auc_score(y[mask], prob[mask]))
+        best = threshold_sweep(y[mask], prob[mask])["f1"].max()
+        assert np.isclose(per_segment.loc[seg, "f1"], best)
+
+
+def test_apply_thresholds_uses_segment_override():
+    thresholds = {"default": 0.5, "segments": {"B1": 0.2}}
+    preds = apply_thresholds(np.array([0.3, 0.3]), thresholds, np.array(["B1", "B2"]))
+    assert preds.tolist() == [1, 0]
+
+
+def test_missing_segments_get_their_own_group():
+    y = np.array([1, 0, 1, 0, 1, 0])
+    prob = np.array([0.9, 0.1, 0.8, 0.3, 0.7, 0.2])
+    sweep = threshold_sweep(y, prob, np.array(["B1", "B1", None, None, "B2", "B2"], dtype=object))
+    per_segment = best_operating_points(sweep)
+    assert per_segment.loc[MISSING_SEGMENT, "support"] == 2
+    assert per_segment.loc["B1", "support"] == 2
+    thresholds = select_thresholds(sweep, min_support=1)
+    assert set(thresholds["segments"]) == {"B1", "B2"}
+
+
+def test_cutoff_sits_between_positive_and_negative_scores():
+    y = np.array([1, 1, 0, 0])
+    prob = np.array([0.9, 0.62, 0.30, 0.1])
+    best = best_operating_points(threshold_sweep(y, prob))
+    assert np.isclose(best.loc["__all__", "threshold"], 0.46)
+    assert best.loc["__all__", "f1"] == 1.0
+
+
+def test_sparse_segments_shrink_toward_global_threshold():
+    y, prob, segments = _sample()
+    sweep = threshold_sweep(y, prob, segments)
+    best = best_operating_points(sweep)
+    thresholds = select_thresholds(sweep, min_support=20)
+    for seg, cutoff in thresholds["segments"].items():
+        lo, hi = sorted([best.loc[seg, "threshold"], thresholds["default"]])
+        assert lo <= cutoff <= hi
+
+
+def test_decision_metrics_match_sklearn():
+    y, prob, segments = _sample()
+    preds = apply_thresholds(prob, {"default": 0.4, "segments": {"B1": 0.6}}, segments)
+    p, r, f, _ = precision_recall_fscore_support(y, preds, average="binary")
+    assert np.allclose(list(decision_metrics(y, preds).values()), [p, r, f])
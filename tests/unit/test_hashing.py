@@ -13,3 +13,11 @@ def test_hash_feature_cross_nonempty():
     b = pd.Series(["1", "2"])
     mat = hash_feature_cross(a, b, 8)
     assert mat.nnz == 2
+
+
+def test_hash_categorical_matches_per_value_hash():
+    from src.utils.hashing import _hash_value
+
+    series = pd.Series(["A", "B", "A"])
+    mat = hash_categorical(series, 16)
+    assert mat.indices.tolist() == [_hash_value(v, 16) for v in series]
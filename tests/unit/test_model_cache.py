@@ -0,0 +1,74 @@
+import lightgbm as lgb
+import numpy as np
+
+from src import config
+from src.utils import model_cache
+
+
+def _tiny_booster():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(50, 3))
+    y = (X[:, 0] > 0).astype(int)
+    return lgb.train({"objective": "binary", "verbose": -1}, lgb.Dataset(X, label=y), num_boost_round=3)
+
+
+def test_put_then_get_from_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MODEL_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(model_cache, "_MEMORY", model_cache.OrderedDict())
+    booster = _tiny_booster()
+    key = model_cache.registry_key("m", "1", "r1")
+    model_cache.put_model(key, booster)
+    model_cache._MEMORY.clear()
+
+    cached = model_cache.get_model(key)
+    X = np.ones((2, 3))
+    assert np.allclose(cached.predict(X), booster.predict(X))
+    assert model_cache.get_model(model_cache.registry_key("m", "2", "r2")) is None
+
+
+def test_evict_keeps_cache_under_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MODEL_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(model_cache, "_MEMORY", model_cache.OrderedDict())
+    booster = _tiny_booster()
+    for rounds in [1, 2, 3]:
+        model_cache.put_model(model_cache.run_key(str(rounds)), lgb.Booster(model_str=booster.model_to_string(num_iteration=rounds)))
+    size = max(p.stat().st_size for p in tmp_path.glob("models/*.txt"))
+    model_cache.evict(max_bytes=size)
+    assert len(list(tmp_path.glob("models/*.txt"))) == 1
+
+
+def test_aliases_share_one_model_file_and_are_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MODEL_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(model_cache, "_MEMORY", model_cache.OrderedDict())
+    booster = _tiny_booster()
+    model_cache.put_model(model_cache.run_key("a"), booster)
+    model_cache.put_model(model_cache.registry_key("m", "1", "r1"), booster)
+    assert len(list(tmp_path.glob("models/*.txt"))) == 1
+    assert len(list(tmp_path.glob("keys/*"))) == 2
+
+    model_cache.evict(max_bytes=0)
+    model_cache._MEMORY.clear()
+    assert not list(tmp_path.glob("keys/*"))
+    assert model_cache.get_model(model_cache.run_key("a")) is None
+
+
+def test_reused_registry_version_from_another_run_misses(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MODEL_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(model_cache, "_MEMORY", model_cache.OrderedDict())
+    model_cache.put_model(model_cache.registry_key("m", "1", "old-run"), _tiny_booster())
+    assert model_cache.get_model(model_cache.registry_key("m", "1", "new-run")) is None
+
+
+def test_put_keeps_the_model_it_just_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "MODEL_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(model_cache, "_MEMORY", model_cache.OrderedDict())
+    monkeypatch.setattr(config, "MODEL_CACHE_MAX_BYTES", 1)
+    booster = _tiny_booster()
+    small = lgb.Booster(model_str=booster.model_to_string(num_iteration=1))
+    model_cache.put_model(model_cache.run_key("a"), booster)
+    model_cache.put_model(model_cache.run_key("b"), small)
+    # re-aliasing the older file makes it most recent, so it survives instead of its new alias dangling
+    model_cache.put_model(model_cache.run_key("c"), booster)
+    model_cache._MEMORY.clear()
+    assert model_cache.get_model(model_cache.run_key("c")) is not None
+    assert model_cache.get_model(model_cache.run_key("b")) is None